@@ -57,12 +57,35 @@ def main():
                     3. OAuth credentials are properly set up
                     4. Redirect URIs include `http://localhost`
                     """)
-        
+
+        # Messages that failed every retry
+        dead_letters = db.get_dead_letters()
+        if dead_letters:
+            with st.expander(f"⚠️ {len(dead_letters)} emails could not be processed"):
+                st.dataframe(
+                    pd.DataFrame([{
+                        'message_id': dead_letter.message_id,
+                        'stage': dead_letter.stage,
+                        'attempts': dead_letter.attempts,
+                        'error': dead_letter.error,
+                        'failed_at': dead_letter.failed_at
+                    } for dead_letter in dead_letters]),
+                    use_container_width=True
+                )
+                if st.button("Retry failed emails"):
+                    count = db.requeue_dead_letters()
+                    st.success(f"{count} emails will be retried on the next refresh.")
+
         # Display applications
         applications = db.get_all_applications()
         if applications:
-            df = pd.DataFrame(applications)
-            
+            df = pd.DataFrame([{
+                'company_name': app.company,
+                'position': app.job_title,
+                'application_date': app.application_date,
+                'status': app.status
+            } for app in applications])
+
             # Convert date strings to datetime
             df['application_date'] = pd.to_datetime(df['application_date'])
             
@@ -102,10 +125,48 @@ def main():
                 .reset_index(drop=True),
                 use_container_width=True
             )
-            
+
         else:
             st.info("No applications found. Click 'Refresh Email Data' to scan your inbox.")
-            
+
+        # Low-confidence statuses
+        review_apps = db.get_applications_needing_review()
+        if review_apps:
+            st.subheader("Needs Review ⚠️")
+            st.caption("The status of these applications was detected with low confidence.")
+            st.dataframe(
+                pd.DataFrame([{
+                    'company': app.company,
+                    'job_title': app.job_title,
+                    'application_date': app.application_date,
+                    'status': app.status,
+                    'confidence': app.status_confidence
+                } for app in review_apps]),
+                use_container_width=True
+            )
+
+        # Email search
+        st.subheader("Search Emails 🔍")
+        search_query = st.text_input("Search subject, sender and body", placeholder="e.g. kubernetes recruiter")
+        if search_query:
+            page_size = config.SEARCH_PAGE_SIZE
+            results, total = db.search_emails(search_query, limit=page_size)
+            if total:
+                pages = (total + page_size - 1) // page_size
+                # Keyed on the query so a new search starts again at page 1
+                page = st.number_input("Page", min_value=1, max_value=pages, value=1, step=1,
+                                       key=f"search_page_{search_query}")
+                if page > 1:
+                    results, total = db.search_emails(search_query, limit=page_size, offset=(page - 1) * page_size)
+                st.caption(f"{total} matching emails — page {page} of {pages}")
+                for result in results:
+                    st.markdown(f"**{result['subject'] or '(no subject)'}** — {result['sender']} · {result['received_date']}")
+                    if result['company']:
+                        st.caption(f"{result['company']} · {result['job_title']} · {result['status']}")
+                    st.markdown(f"> {result['snippet']}")
+            else:
+                st.info("No matching emails found.")
+
     except Exception as e:
         st.error(f"Error: {str(e)}")
         st.error("Please make sure you have configured your credentials correctly in Streamlit secrets.")
@@ -69,3 +69,22 @@ DATABASE_URL = "sqlite:///job_applications.db"
 
 # Email scanning configuration
 SCAN_INTERVAL = 24  # hours
+
+# Email search index configuration
+EMAIL_INDEX_BODY_CHARS = 5000  # characters of cleaned body text kept per email
+SEARCH_PAGE_SIZE = 20
+
+# Status classification configuration
+# Classifications below this confidence are flagged for review. Confidence is
+# 1 - exp(-margin) over the score gap between the top two statuses (see
+# status_classifier.py), so 0.3 flags margins under ~0.36: ties and a lone
+# weak phrase such as "next steps", but not a single body hit like
+# "interview" (margin 1.0). Emails with no phrase hits get confidence 0 and
+# are always flagged.
+STATUS_REVIEW_THRESHOLD = 0.3
+
+# Scan queue configuration
+GMAIL_NUM_RETRIES = 3  # retries with exponential backoff inside a single Gmail API call
+SCAN_MAX_ATTEMPTS = 5  # failed attempts before a message is moved to the dead-letter table
+SCAN_RETRY_BASE_SECONDS = 30  # delay before the first retry, doubled after each failure
+SCAN_RETRY_MAX_SECONDS = 6 * 60 * 60
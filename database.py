@@ -1,8 +1,9 @@
-from sqlalchemy import create_engine, Column, Integer, String, Date
+from sqlalchemy import create_engine, inspect, Column, Integer, String, Date, DateTime, Text, Float, Boolean, ForeignKey, func, or_, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from datetime import datetime, timedelta
 import os
-from config import DATABASE_URL
+from config import DATABASE_URL, SCAN_MAX_ATTEMPTS, SCAN_RETRY_BASE_SECONDS, SCAN_RETRY_MAX_SECONDS
 
 Base = declarative_base()
 
@@ -14,18 +15,112 @@ class Application(Base):
     job_title = Column(String(255))
     application_date = Column(Date)
     status = Column(String(50))
+    status_confidence = Column(Float)
+    needs_review = Column(Boolean, default=False)
+
+class EmailMessage(Base):
+    __tablename__ = 'emails'
+    
+    id = Column(Integer, primary_key=True)
+    message_id = Column(String(255), unique=True, index=True, nullable=False)
+    application_id = Column(Integer, ForeignKey('applications.id'), index=True)
+    subject = Column(Text)
+    sender = Column(Text)
+    body = Column(Text)
+    received_date = Column(Date)
+
+# Scan queue states. A message moves pending -> fetched -> parsed -> stored,
+# or to failed once it runs out of attempts.
+QUEUE_PENDING = 'pending'
+QUEUE_FETCHED = 'fetched'
+QUEUE_PARSED = 'parsed'
+QUEUE_STORED = 'stored'
+QUEUE_FAILED = 'failed'
+QUEUE_UNFINISHED = (QUEUE_PENDING, QUEUE_FETCHED, QUEUE_PARSED)
+
+class ScanQueueItem(Base):
+    __tablename__ = 'scan_queue'
+    
+    id = Column(Integer, primary_key=True)
+    message_id = Column(String(255), unique=True, index=True, nullable=False)
+    state = Column(String(20), index=True, nullable=False, default=QUEUE_PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime)
+    payload = Column(Text)  # JSON of the fetched headers and body
+    parsed = Column(Text)  # JSON of the extracted application info
+    last_error = Column(Text)
+    updated_at = Column(DateTime, default=datetime.now)
+
+class DeadLetter(Base):
+    __tablename__ = 'dead_letters'
+    
+    id = Column(Integer, primary_key=True)
+    message_id = Column(String(255), index=True, nullable=False)
+    stage = Column(String(20))  # queue state the message was stuck in
+    error = Column(Text)
+    attempts = Column(Integer)
+    failed_at = Column(DateTime, default=datetime.now)
+
+# SQLite FTS5 index over the emails table. It is an external-content table, so
+# the text is stored once in `emails` and the triggers keep the index in sync.
+SQLITE_FTS_SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS emails_fts USING fts5(
+        subject, sender, body,
+        content='emails', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS emails_fts_insert AFTER INSERT ON emails BEGIN
+        INSERT INTO emails_fts(rowid, subject, sender, body)
+        VALUES (new.id, new.subject, new.sender, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS emails_fts_delete AFTER DELETE ON emails BEGIN
+        INSERT INTO emails_fts(emails_fts, rowid, subject, sender, body)
+        VALUES ('delete', old.id, old.subject, old.sender, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS emails_fts_update AFTER UPDATE ON emails BEGIN
+        INSERT INTO emails_fts(emails_fts, rowid, subject, sender, body)
+        VALUES ('delete', old.id, old.subject, old.sender, old.body);
+        INSERT INTO emails_fts(rowid, subject, sender, body)
+        VALUES (new.id, new.subject, new.sender, new.body);
+    END
+    """,
+]
 
 class DatabaseManager:
     def __init__(self):
         try:
             self.engine = create_engine(DATABASE_URL)
             Base.metadata.create_all(self.engine)
+            self._add_missing_columns()
+            self.use_fts = self.engine.dialect.name == 'sqlite'
+            if self.use_fts:
+                with self.engine.begin() as conn:
+                    for statement in SQLITE_FTS_SCHEMA:
+                        conn.execute(text(statement))
             Session = sessionmaker(bind=self.engine)
             self.session = Session()
         except Exception as e:
             print(f"Error initializing database: {e}")
             raise
     
+    def _add_missing_columns(self):
+        """Add columns introduced after a table was first created"""
+        inspector = inspect(self.engine)
+        for table in Base.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    with self.engine.begin() as conn:
+                        conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+    
     def add_application(self, company, job_title, application_date, status):
         try:
             application = Application(
@@ -47,6 +142,228 @@ class DatabaseManager:
         except Exception as e:
             print(f"Error retrieving applications: {e}")
             return []
+
+    def get_applications_needing_review(self):
+        """Get applications whose status was classified with low confidence"""
+        try:
+            return (self.session.query(Application)
+                    .filter(Application.needs_review.is_(True))
+                    .order_by(Application.status_confidence)
+                    .all())
+        except Exception as e:
+            print(f"Error retrieving applications for review: {e}")
+            return []
+
+    def enqueue_messages(self, message_ids):
+        """Add newly listed Gmail messages to the scan queue.
+
+        Messages already queued or already indexed are skipped. Returns the
+        number of messages added.
+        """
+        try:
+            message_ids = list(dict.fromkeys(message_ids))
+            if not message_ids:
+                return 0
+            known = {row.message_id for row in self.session.query(ScanQueueItem.message_id)
+                     .filter(ScanQueueItem.message_id.in_(message_ids))}
+            known.update(row.message_id for row in self.session.query(EmailMessage.message_id)
+                         .filter(EmailMessage.message_id.in_(message_ids)))
+            new_ids = [message_id for message_id in message_ids if message_id not in known]
+            for message_id in new_ids:
+                self.session.add(ScanQueueItem(message_id=message_id, state=QUEUE_PENDING))
+            self.session.commit()
+            return len(new_ids)
+        except Exception as e:
+            self.session.rollback()
+            print(f"Error queueing messages: {e}")
+            raise
+
+    def get_unfinished_messages(self):
+        """Get queued messages that still need work and are due for an attempt"""
+        try:
+            now = datetime.now()
+            return (self.session.query(ScanQueueItem)
+                    .filter(ScanQueueItem.state.in_(QUEUE_UNFINISHED))
+                    .filter(or_(ScanQueueItem.next_attempt_at.is_(None), ScanQueueItem.next_attempt_at <= now))
+                    .order_by(ScanQueueItem.id)
+                    .all())
+        except Exception as e:
+            print(f"Error retrieving scan queue: {e}")
+            return []
+
+    def update_queue_item(self, item, state, payload=None, parsed=None):
+        """Move a queued message to its next state, keeping any stage output"""
+        try:
+            item.state = state
+            if payload is not None:
+                item.payload = payload
+            if parsed is not None:
+                item.parsed = parsed
+            item.last_error = None
+            item.next_attempt_at = None
+            item.updated_at = datetime.now()
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            print(f"Error updating scan queue: {e}")
+            raise
+
+    def record_queue_failure(self, item, error, retry=True):
+        """Record a failed attempt on a queued message.
+
+        The message stays in its current state and is retried after an
+        exponential backoff. Once it has used up SCAN_MAX_ATTEMPTS, or at once
+        with retry=False for errors that will not go away, it is marked failed
+        and copied to the dead-letter table.
+        """
+        try:
+            item.attempts = (item.attempts or 0) + 1
+            item.last_error = str(error)
+            item.updated_at = datetime.now()
+            if not retry or item.attempts >= SCAN_MAX_ATTEMPTS:
+                self.session.add(DeadLetter(
+                    message_id=item.message_id,
+                    stage=item.state,
+                    error=item.last_error,
+                    attempts=item.attempts
+                ))
+                item.state = QUEUE_FAILED
+                item.next_attempt_at = None
+            else:
+                delay = min(SCAN_RETRY_BASE_SECONDS * 2 ** (item.attempts - 1), SCAN_RETRY_MAX_SECONDS)
+                item.next_attempt_at = item.updated_at + timedelta(seconds=delay)
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            print(f"Error recording scan failure: {e}")
+            raise
+
+    def save_processed_email(self, item, subject, sender, body, received_date, application=None):
+        """Store a parsed message and mark it done in a single transaction.
+
+        `application` is a dict of Application fields, or None when the email
+        did not contain enough information to create one.
+        """
+        try:
+            application_id = None
+            if application:
+                record = Application(**application)
+                self.session.add(record)
+                self.session.flush()
+                application_id = record.id
+            self.session.add(EmailMessage(
+                message_id=item.message_id,
+                application_id=application_id,
+                subject=subject,
+                sender=sender,
+                body=body,
+                received_date=received_date
+            ))
+            item.state = QUEUE_STORED
+            item.payload = None
+            item.parsed = None
+            item.last_error = None
+            item.updated_at = datetime.now()
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            print(f"Error storing processed email: {e}")
+            raise
+
+    def get_dead_letters(self):
+        try:
+            return self.session.query(DeadLetter).order_by(DeadLetter.failed_at.desc()).all()
+        except Exception as e:
+            print(f"Error retrieving dead letters: {e}")
+            return []
+
+    def requeue_dead_letters(self):
+        """Give failed messages a fresh set of attempts from the stage they failed in"""
+        try:
+            dead_letters = self.session.query(DeadLetter).all()
+            for dead_letter in dead_letters:
+                item = self.session.query(ScanQueueItem).filter_by(message_id=dead_letter.message_id).first()
+                if item and item.state == QUEUE_FAILED:
+                    item.state = dead_letter.stage
+                    item.attempts = 0
+                    item.next_attempt_at = None
+                    item.updated_at = datetime.now()
+                self.session.delete(dead_letter)
+            self.session.commit()
+            return len(dead_letters)
+        except Exception as e:
+            self.session.rollback()
+            print(f"Error requeueing dead letters: {e}")
+            raise
+
+    def search_emails(self, query, limit=20, offset=0):
+        """Search indexed emails, best matches first.
+
+        Returns a tuple of (results, total) where results is a list of dicts
+        for the requested page and total is the number of matching emails.
+        """
+        terms = query.split()
+        if not terms:
+            return [], 0
+        try:
+            if self.use_fts:
+                return self._search_emails_fts(terms, limit, offset)
+            return self._search_emails_like(terms, limit, offset)
+        except Exception as e:
+            print(f"Error searching emails: {e}")
+            return [], 0
+
+    def _search_emails_fts(self, terms, limit, offset):
+        # Quote every term so user input is never parsed as FTS5 query syntax
+        match = ' '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        total = self.session.execute(
+            text("SELECT count(*) FROM emails_fts WHERE emails_fts MATCH :match"),
+            {'match': match}
+        ).scalar()
+        rows = self.session.execute(
+            text("""
+                SELECT e.id, e.message_id, e.subject, e.sender, e.received_date,
+                       a.company, a.job_title, a.status,
+                       snippet(emails_fts, 2, '**', '**', '...', 16) AS snippet
+                FROM emails_fts
+                JOIN emails e ON e.id = emails_fts.rowid
+                LEFT JOIN applications a ON a.id = e.application_id
+                WHERE emails_fts MATCH :match
+                ORDER BY bm25(emails_fts, 5.0, 2.0, 1.0)
+                LIMIT :limit OFFSET :offset
+            """).columns(received_date=Date),  # a date, as the LIKE fallback returns
+            {'match': match, 'limit': limit, 'offset': offset}
+        ).mappings().all()
+        return [dict(row) for row in rows], total
+
+    def _search_emails_like(self, terms, limit, offset):
+        # Fallback for databases without FTS5: every term must appear somewhere
+        q = self.session.query(EmailMessage, Application).outerjoin(
+            Application, Application.id == EmailMessage.application_id
+        )
+        for term in terms:
+            pattern = f"%{term}%"
+            q = q.filter(or_(
+                EmailMessage.subject.ilike(pattern),
+                EmailMessage.sender.ilike(pattern),
+                EmailMessage.body.ilike(pattern)
+            ))
+        total = q.with_entities(func.count(EmailMessage.id)).scalar()
+        rows = q.order_by(EmailMessage.received_date.desc()).limit(limit).offset(offset).all()
+        results = []
+        for email_message, application in rows:
+            results.append({
+                'id': email_message.id,
+                'message_id': email_message.message_id,
+                'subject': email_message.subject,
+                'sender': email_message.sender,
+                'received_date': email_message.received_date,
+                'company': application.company if application else None,
+                'job_title': application.job_title if application else None,
+                'status': application.status if application else None,
+                'snippet': (email_message.body or '')[:200]
+            })
+        return results, total
             
     def __del__(self):
         if hasattr(self, 'session'):
@@ -4,11 +4,13 @@ from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
 import os
 import pickle
-from database import DatabaseManager
+from database import DatabaseManager, QUEUE_PENDING, QUEUE_FETCHED, QUEUE_PARSED
+from status_classifier import StatusClassifier
 from bs4 import BeautifulSoup
 import re
 from datetime import datetime
 import base64
+import json
 import email.utils
 import time
 import config
@@ -17,6 +19,8 @@ class EmailProcessor:
     def __init__(self):
         """Initialize the EmailProcessor"""
         self.service = None
+        self.db = DatabaseManager()
+        self.classifier = StatusClassifier()
         self.setup_gmail_service()
 
     def setup_gmail_service(self):
@@ -264,7 +268,15 @@ class EmailProcessor:
 
         return "Unknown Position"
 
-    def extract_application_info(self, email_body, subject="", email_from="", headers=None):
+    def extract_application_info(self, email_body, subject="", email_from="", headers=None, classify=True,
+                                 raise_errors=False):
+        """Extract application details from an email.
+
+        With classify=False the status fields are left as None so a caller can
+        classify many emails at once with StatusClassifier.classify. With
+        raise_errors=True decoding and extraction errors are raised instead of
+        falling back to placeholder values.
+        """
         try:
             # Get the actual email date
             email_date = self.extract_date_from_email(headers) if headers else datetime.now().date()
@@ -272,9 +284,12 @@ class EmailProcessor:
             # Decode and clean email body
             if email_body:
                 try:
-                    email_body = base64.urlsafe_b64decode(email_body.encode('ASCII')).decode('utf-8')
+                    # Replace undecodable bytes so a non-UTF-8 body still yields the subject and sender
+                    email_body = base64.urlsafe_b64decode(email_body.encode('ASCII')).decode('utf-8', errors='replace')
                 except Exception as e:
                     print(f"Error decoding email body: {e}")
+                    if raise_errors:
+                        raise
                     email_body = ""
             
             # Clean and extract text
@@ -284,24 +299,96 @@ class EmailProcessor:
             # Extract information
             company = self.extract_company_name(text, subject, email_from)
             job_title = self.extract_job_title(text, subject)
-            status = self.determine_status(text, subject)
+            classification = {'status': None, 'confidence': None, 'needs_review': None}
+            if classify:
+                classification = self.classifier.classify([text], [subject])[0]
             
             return {
                 'company': company,
                 'job_title': job_title,
-                'status': status,
-                'application_date': email_date
+                'status': classification['status'],
+                'status_confidence': classification['confidence'],
+                'needs_review': classification['needs_review'],
+                'application_date': email_date,
+                'text': text
             }
         except Exception as e:
             print(f"Error extracting application info: {e}")
+            if raise_errors:
+                raise
             return {
                 'company': "Unknown Company",
                 'job_title': "Unknown Position",
                 'status': "Under Review",
-                'application_date': datetime.now().date()
+                'status_confidence': 0.0,
+                'needs_review': True,
+                'application_date': datetime.now().date(),
+                'text': ""
             }
     
+    def fetch_message(self, message_id):
+        """Fetch a message from Gmail and return its headers and raw body data"""
+        msg = self.service.users().messages().get(userId='me', id=message_id).execute(
+            num_retries=config.GMAIL_NUM_RETRIES)
+        email_data = msg['payload']
+        
+        # Extract email body
+        email_body = ""
+        if 'parts' in email_data:
+            for part in email_data['parts']:
+                if part['mimeType'] == 'text/plain':
+                    email_body = part['body'].get('data', '')
+                    break
+        else:
+            email_body = email_data['body'].get('data', '')
+        
+        return {'headers': email_data['headers'], 'body': email_body}
+
+    def parse_message(self, message):
+        """Extract application info from a fetched message, leaving the status to the batch classifier"""
+        headers = message['headers']
+        
+        # Get subject and sender
+        subject = ""
+        email_from = ""
+        for header in headers:
+            if header['name'].lower() == 'subject':
+                subject = header['value']
+            elif header['name'].lower() == 'from':
+                email_from = header['value']
+        
+        # Raise errors so the scan queue retries the message instead of storing placeholders
+        info = self.extract_application_info(message['body'], subject, email_from, headers, classify=False,
+                                             raise_errors=True)
+        return {
+            'subject': subject,
+            'sender': email_from,
+            'company': info['company'],
+            'job_title': info['job_title'],
+            'application_date': info['application_date'].isoformat(),
+            'text': info['text']
+        }
+
+    def record_failure(self, item, error, retry=True):
+        """Record a failed stage on a queued message without stopping the scan"""
+        # Read before the attempt; a rolled-back item may not be readable afterwards
+        message_id = item.message_id
+        try:
+            self.db.record_queue_failure(item, error, retry=retry)
+        except Exception as e:
+            # The failure is lost, so the message is simply retried on the next scan
+            print(f"Error recording failure for message {message_id}: {e}")
+
     def scan_emails(self):
+        """Scan Gmail for job emails through the durable scan queue.
+
+        Listed messages are queued and each one is moved through the fetch,
+        parse and store stages, saving its progress after every stage. A
+        failed stage is retried on a later scan after a backoff, so a
+        restarted scan only redoes unfinished work.
+        """
+        list_error = None
+        added = None
         try:
             # Search for relevant emails from the last month
             query = """
@@ -314,151 +401,78 @@ class EmailProcessor:
                 newer_than:30d
             """
             
-            results = self.service.users().messages().list(userId='me', q=query).execute()
+            results = self.service.users().messages().list(userId='me', q=query).execute(
+                num_retries=config.GMAIL_NUM_RETRIES)
             messages = results.get('messages', [])
-            
-            if not messages:
-                print("No new job-related emails found")
-                return
-            
-            for message in messages:
-                try:
-                    msg = self.service.users().messages().get(userId='me', id=message['id']).execute()
-                    email_data = msg['payload']
-                    
-                    # Get headers
-                    headers = email_data['headers']
-                    
-                    # Get subject and sender
-                    subject = ""
-                    email_from = ""
-                    for header in headers:
-                        if header['name'].lower() == 'subject':
-                            subject = header['value']
-                        elif header['name'].lower() == 'from':
-                            email_from = header['value']
-                    
-                    # Extract email body
-                    email_body = ""
-                    if 'parts' in email_data:
-                        for part in email_data['parts']:
-                            if part['mimeType'] == 'text/plain':
-                                email_body = part['body'].get('data', '')
-                                break
-                    else:
-                        email_body = email_data['body'].get('data', '')
-                    
-                    # Extract application info
-                    info = self.extract_application_info(email_body, subject, email_from, headers)
-                    
-                    # Only add if we have meaningful information
-                    if info['company'] != "Unknown Company" or info['job_title'] != "Unknown Position":
-                        self.db.add_application(
-                            company=info['company'],
-                            job_title=info['job_title'],
-                            application_date=info['application_date'],
-                            status=info['status']
-                        )
-                        
-                except Exception as e:
-                    print(f"Error processing message: {e}")
-                    continue
-                    
+            added = self.db.enqueue_messages([message['id'] for message in messages])
         except Exception as e:
-            print(f"Error scanning emails: {e}")
-            raise
-
-    def determine_status(self, text, subject):
-        """Determine application status from email content"""
-        text = text.lower()
-        subject = subject.lower()
-        full_text = f"{subject} {text}"
-        
-        # Strong rejection indicators (if any of these are found, it's definitely a rejection)
-        strong_rejection_phrases = [
-            "regret to inform",
-            "we regret",
-            "regrettably",
-            "regret to advise",
-            "regret to say",
-            "regret to tell",
-            "regret to communicate",
-        ]
-        
-        # Check for strong rejection indicators first
-        if any(phrase in full_text for phrase in strong_rejection_phrases):
-            return "Rejected"
+            # Keep going so work queued by earlier scans is not held up
+            print(f"Error listing emails: {e}")
+            list_error = e
         
-        # Other rejection indicators (check these only if no strong indicators found)
-        rejection_phrases = [
-            "unfortunately",
-            "not moving forward",
-            "decided to proceed with other",
-            "not selected",
-            "not successful",
-            "not shortlisted",
-            "not proceed",
-            "position has been filled",
-            "selected another candidate",
-            "pursue other candidates",
-            "better suited candidates",
-            "do not match our current requirements",
-            "unable to offer",
-            "cannot take your application forward",
-            "wish you success in your future",
-            "best of luck in your future",
-            "thank you for your interest",  # When combined with above phrases
-            "keep your profile on file",    # When combined with above phrases
-        ]
+        queue = self.db.get_unfinished_messages()
+        if added == 0 and not queue:
+            print("No new job-related emails found")
         
-        # Interview indicators
-        interview_phrases = [
-            "interview",
-            "would like to meet",
-            "schedule a call",
-            "discuss your application",
-            "next steps",
-            "move forward with your application",
-            "pleased to inform",
-            "successful in your application",
-            "move to the next stage",
-            "would like to speak with you",
-            "invite you to",
-            "follow up discussion",
-        ]
+        # Fetch and parse, saving each stage so a retry resumes where it failed
+        parsed = []
+        for item in queue:
+            try:
+                if item.state == QUEUE_PENDING:
+                    message = self.fetch_message(item.message_id)
+                    self.db.update_queue_item(item, QUEUE_FETCHED, payload=json.dumps(message))
+                
+                if item.state == QUEUE_FETCHED:
+                    try:
+                        info = self.parse_message(json.loads(item.payload))
+                    except Exception as e:
+                        # Parsing the same payload again fails the same way, so don't retry it
+                        print(f"Error parsing message {item.message_id}: {e}")
+                        self.record_failure(item, e, retry=False)
+                        continue
+                    self.db.update_queue_item(item, QUEUE_PARSED, parsed=json.dumps(info))
+                
+                parsed.append((item, json.loads(item.parsed)))
+            except Exception as e:
+                print(f"Error processing message {item.message_id}: {e}")
+                self.record_failure(item, e)
         
-        # Offer indicators
-        offer_phrases = [
-            "job offer",
-            "offer letter",
-            "pleased to offer",
-            "formal offer",
-            "offer of employment",
-            "would like to offer",
-            "happy to offer",
-        ]
+        classifications = self.classifier.classify(
+            [info['text'] for _, info in parsed],
+            [info['subject'] for _, info in parsed]
+        )
         
-        # Application received indicators
-        received_phrases = [
-            "application received",
-            "thank you for applying",
-            "received your application",
-            "confirm receipt",
-            "successfully submitted",
-            "application has been submitted",
-            "thank you for your interest",  # Only if no rejection phrases
-            "will review your application",
-            "application is under review",
-        ]
+        for (item, info), classification in zip(parsed, classifications):
+            try:
+                application_date = datetime.fromisoformat(info['application_date']).date()
+                
+                # Only add if we have meaningful information
+                application = None
+                if info['company'] != "Unknown Company" or info['job_title'] != "Unknown Position":
+                    application = {
+                        'company': info['company'],
+                        'job_title': info['job_title'],
+                        'application_date': application_date,
+                        'status': classification['status'],
+                        'status_confidence': classification['confidence'],
+                        'needs_review': classification['needs_review']
+                    }
+                
+                self.db.save_processed_email(
+                    item,
+                    subject=info['subject'],
+                    sender=info['sender'],
+                    body=info['text'][:config.EMAIL_INDEX_BODY_CHARS],
+                    received_date=application_date,
+                    application=application
+                )
+            except Exception as e:
+                print(f"Error storing message {item.message_id}: {e}")
+                self.record_failure(item, e)
         
-        # Check for other statuses
-        if any(phrase in full_text for phrase in offer_phrases):
-            return "Offer Received"
-        elif any(phrase in full_text for phrase in rejection_phrases):
-            return "Rejected"
-        elif any(phrase in full_text for phrase in interview_phrases):
-            return "Interview Scheduled"
-        elif any(phrase in full_text for phrase in received_phrases):
-            return "Application Received"
-            
-        return "Under Review"
+        if list_error is not None:
+            raise list_error
+
+    def determine_status(self, text, subject):
+        """Determine application status from email content"""
+        return self.classifier.classify([text], [subject])[0]['status']
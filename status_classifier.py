@@ -0,0 +1,219 @@
+import re
+import numpy as np
+import config
+
+STATUSES = [
+    "Application Received",
+    "Under Review",
+    "Interview Scheduled",
+    "Rejected",
+    "Offer Received",
+]
+
+# (phrase, {status: weight}). A phrase may vote for more than one status.
+PHRASE_WEIGHTS = [
+    # Strong rejection indicators
+    ("regret to inform", {"Rejected": 4.0}),
+    ("we regret", {"Rejected": 4.0}),
+    ("regrettably", {"Rejected": 4.0}),
+    ("regret to advise", {"Rejected": 4.0}),
+    ("regret to say", {"Rejected": 4.0}),
+    ("regret to tell", {"Rejected": 4.0}),
+    ("regret to communicate", {"Rejected": 4.0}),
+
+    # Rejection indicators
+    ("unfortunately", {"Rejected": 1.5}),
+    ("not moving forward", {"Rejected": 3.0}),
+    ("decided to proceed with other", {"Rejected": 3.0}),
+    ("not selected", {"Rejected": 3.0}),
+    ("not successful", {"Rejected": 3.0}),
+    ("not shortlisted", {"Rejected": 3.0}),
+    ("not proceed", {"Rejected": 3.0}),
+    ("position has been filled", {"Rejected": 3.0}),
+    ("selected another candidate", {"Rejected": 3.0}),
+    ("pursue other candidates", {"Rejected": 3.0}),
+    ("better suited candidates", {"Rejected": 3.0}),
+    ("do not match our current requirements", {"Rejected": 3.0}),
+    ("unable to offer", {"Rejected": 3.0}),
+    ("cannot take your application forward", {"Rejected": 3.0}),
+    ("wish you success in your future", {"Rejected": 1.5}),
+    ("best of luck in your future", {"Rejected": 1.5}),
+    ("keep your profile on file", {"Rejected": 1.0}),
+    ("thank you for your interest", {"Rejected": 0.5, "Application Received": 1.0}),
+
+    # Interview indicators
+    ("interview", {"Interview Scheduled": 1.5}),
+    ("would like to meet", {"Interview Scheduled": 2.0}),
+    ("schedule a call", {"Interview Scheduled": 2.0}),
+    ("discuss your application", {"Interview Scheduled": 1.5}),
+    ("next steps", {"Interview Scheduled": 0.75}),
+    ("move forward with your application", {"Interview Scheduled": 2.0}),
+    ("pleased to inform", {"Interview Scheduled": 1.0}),
+    ("successful in your application", {"Interview Scheduled": 2.0}),
+    ("move to the next stage", {"Interview Scheduled": 2.0}),
+    ("would like to speak with you", {"Interview Scheduled": 2.0}),
+    ("invite you to", {"Interview Scheduled": 1.5}),
+    ("follow up discussion", {"Interview Scheduled": 1.5}),
+
+    # Offer indicators
+    ("job offer", {"Offer Received": 3.0}),
+    ("offer letter", {"Offer Received": 3.0}),
+    ("pleased to offer", {"Offer Received": 4.0}),
+    ("formal offer", {"Offer Received": 3.0}),
+    ("offer of employment", {"Offer Received": 4.0}),
+    ("would like to offer", {"Offer Received": 4.0}),
+    ("happy to offer", {"Offer Received": 4.0}),
+
+    # Application received indicators
+    ("application received", {"Application Received": 2.0}),
+    ("thank you for applying", {"Application Received": 2.0}),
+    ("received your application", {"Application Received": 2.0}),
+    ("confirm receipt", {"Application Received": 2.0}),
+    ("successfully submitted", {"Application Received": 2.0}),
+    ("application has been submitted", {"Application Received": 2.0}),
+    ("will review your application", {"Application Received": 1.5}),
+    ("application is under review", {"Application Received": 1.5}),
+]
+
+# Words that flip the meaning of a phrase found shortly after them in the
+# same sentence, e.g. "we will not schedule a call" or "this is not a job
+# offer". A negation must be followed by another word, so "no-reply" and
+# "ref no. 4821" do not count.
+NEGATIONS = ["not", "no", "never", "unable to", "cannot", "can't", "won't", "don't", "isn't"]
+NEGATION_WINDOW = 25  # characters before a phrase checked for negation
+SENTENCE_BREAKS = ".!?;:\n"  # the negation window stops at the last of these
+NEGATION_FACTOR = -0.5  # negated hits count against their status
+
+SUBJECT_FACTOR = 1.5  # hits in the subject line count more than body hits
+# Baseline score so emails with no hits stay "Under Review". It is below the
+# weakest phrase (0.75) so any single hit decides the status.
+UNDER_REVIEW_PRIOR = 0.5
+
+# Text between documents in the batch corpus; phrases never match across it
+SEPARATOR = "\x00"
+
+def _trie_pattern(words):
+    """Build a regex alternation of words factored by common prefixes.
+
+    The regex engine tries alternatives one by one, so sharing prefixes
+    ("regret to inform|regret to say" -> "regret to (?:inform|say)") keeps
+    the number of branches tried at each position small. Longer words win
+    over their prefixes because the optional tails are greedy.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return '(?:' + pattern + ')?' if '' in node else pattern
+
+    return build(trie)
+
+class StatusClassifier:
+    def __init__(self, phrase_weights=PHRASE_WEIGHTS):
+        """Build the phrase x status weight matrix and the phrase matcher"""
+        self.phrases = [phrase for phrase, _ in phrase_weights]
+        self.weights = np.zeros((len(self.phrases), len(STATUSES)))
+        for i, (_, votes) in enumerate(phrase_weights):
+            for status, weight in votes.items():
+                self.weights[i, STATUSES.index(status)] = weight
+
+        # Column of every phrase, keyed by its text
+        self.columns = {phrase: col for col, phrase in enumerate(self.phrases)}
+        # One alternation of all phrases, tried at every word start. The match
+        # sits in a lookahead so overlapping phrases ("we regret" and "regret
+        # to inform") are all found.
+        self.pattern = re.compile(r"\b(?=(" + _trie_pattern(self.phrases) + "))")
+        # Searched with the hit as the end of the string, so "\Z" is the hit:
+        # the negation is followed by a word (possibly the hit itself) and no
+        # sentence break comes between them
+        self.negation_pattern = re.compile(
+            "(?<![a-z0-9'])" + _trie_pattern(NEGATIONS) + r"(?=[ \t]+(?:[a-z]|\Z))"
+            + "[^" + re.escape(SENTENCE_BREAKS) + r"]*\Z"
+        )
+
+        # Phrases that are themselves negative ("not selected") are not negated again
+        self.negatable = np.array([
+            not any(phrase == negation or phrase.startswith(negation + " ") for negation in NEGATIONS)
+            for phrase in self.phrases
+        ])
+
+        self.prior = np.zeros(len(STATUSES))
+        self.prior[STATUSES.index("Under Review")] = UNDER_REVIEW_PRIOR
+
+    def featurize(self, texts, subjects):
+        """Turn a batch of emails into a sparse phrase-hit matrix.
+
+        Returns (rows, cols, values) in coordinate form: email `rows[k]`
+        contains phrase `cols[k]` with hit weight `values[k]`.
+        """
+        # Lay out each email as "subject SEP body SEP" in one lowercased
+        # corpus so the whole batch is matched in a single regex pass.
+        documents = []
+        for text, subject in zip(texts, subjects):
+            documents.append((subject or "").lower())
+            documents.append((text or "").lower())
+        corpus = SEPARATOR.join(documents) + SEPARATOR
+        separators = np.cumsum([len(document) + 1 for document in documents]) - 1
+
+        matches = list(self.pattern.finditer(corpus))
+        starts = np.array([match.start() for match in matches], dtype=int)
+        cols = np.array([self.columns[match.group(1)] for match in matches], dtype=int)
+
+        segments = np.searchsorted(separators, starts)
+        rows = segments // 2
+        values = np.where(segments % 2 == 0, SUBJECT_FACTOR, 1.0)
+
+        # A hit is negated when a negation word precedes it within the window,
+        # in the same subject or body and the same sentence
+        segment_starts = np.concatenate(([0], separators[:-1] + 1))[segments]
+        window_starts = np.maximum(starts - NEGATION_WINDOW, segment_starts)
+        negated = np.array([
+            negatable and self.negation_pattern.search(corpus, window_start, start) is not None
+            for negatable, window_start, start in zip(self.negatable[cols].tolist(), window_starts.tolist(),
+                                                      starts.tolist())
+        ], dtype=bool)
+        values = np.where(negated, values * NEGATION_FACTOR, values)
+
+        return rows, cols, values
+
+    def score(self, texts, subjects):
+        """Score every email against every status, shape (emails, statuses)"""
+        return self._score_hits(len(texts), *self.featurize(texts, subjects))
+
+    def _score_hits(self, count, rows, cols, values):
+        """Add the weighted phrase hits from featurize to the prior of each email"""
+        scores = np.tile(self.prior, (count, 1))
+        np.add.at(scores, rows, values[:, None] * self.weights[cols])
+        return scores
+
+    def classify(self, texts, subjects):
+        """Classify a batch of emails.
+
+        Returns one dict per email with the predicted status, a confidence
+        between 0 and 1, and whether the result should be reviewed by hand.
+        Confidence is 1 - exp(-margin), where margin is how far the top
+        status scores above the runner-up, so ties get 0. Emails without any
+        phrase hits are "Under Review" with confidence 0: nothing supports it.
+        """
+        if not texts:
+            return []
+        rows, cols, values = self.featurize(texts, subjects)
+        scores = self._score_hits(len(texts), rows, cols, values)
+        labels = scores.argmax(axis=1)
+        runner_up, top = np.sort(scores, axis=1)[:, -2:].T
+        has_hits = np.bincount(rows, minlength=len(texts)) > 0
+        confidences = np.where(has_hits, 1 - np.exp(-(top - runner_up)), 0.0)
+        needs_review = confidences < config.STATUS_REVIEW_THRESHOLD
+
+        return [
+            {'status': STATUSES[label], 'confidence': confidence, 'needs_review': review}
+            for label, confidence, review in zip(labels.tolist(), confidences.round(3).tolist(), needs_review.tolist())
+        ]
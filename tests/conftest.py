@@ -0,0 +1,19 @@
+import pytest
+import database
+from database import DatabaseManager
+
+
+@pytest.fixture
+def database_url(tmp_path, monkeypatch):
+    """Point DatabaseManager at a fresh SQLite file"""
+    url = f"sqlite:///{tmp_path / 'job_applications.db'}"
+    monkeypatch.setattr(database, 'DATABASE_URL', url)
+    return url
+
+
+@pytest.fixture
+def db(database_url):
+    manager = DatabaseManager()
+    yield manager
+    manager.session.close()
+    manager.engine.dispose()
@@ -0,0 +1,106 @@
+from datetime import date
+import pytest
+from sqlalchemy import text
+from database import Application, EmailMessage
+
+
+def add_email(db, message_id, subject="", body="", sender="Careers <jobs@example.com>",
+              received_date=date(2026, 10, 5), application=None):
+    email_message = EmailMessage(message_id=message_id, subject=subject, sender=sender, body=body,
+                                 received_date=received_date, application_id=application.id if application else None)
+    db.session.add(email_message)
+    db.session.commit()
+    return email_message
+
+
+def message_ids(db, query, **kwargs):
+    results, _ = db.search_emails(query, **kwargs)
+    return [result['message_id'] for result in results]
+
+
+@pytest.fixture(params=['fts', 'like'])
+def search_db(request, db):
+    """The database with each search backend in turn"""
+    db.use_fts = request.param == 'fts'
+    return db
+
+
+def test_triggers_keep_index_in_sync(db):
+    email_message = add_email(db, 'm1', subject="Interview invitation", body="Let's talk about kubernetes")
+    assert message_ids(db, "kubernetes") == ['m1']
+
+    email_message.body = "Let's talk about terraform"
+    db.session.commit()
+    assert message_ids(db, "kubernetes") == []
+    assert message_ids(db, "terraform") == ['m1']
+
+    db.session.delete(email_message)
+    db.session.commit()
+    assert message_ids(db, "terraform") == []
+    assert db.session.execute(text("SELECT count(*) FROM emails_fts")).scalar() == 0
+
+
+@pytest.mark.parametrize("query", ['"acme', 'acme"', 'acme*', 'acme -', '(acme)', 'acme:'])
+def test_fts_syntax_in_queries_is_searched_literally(db, query):
+    add_email(db, 'm1', body="Welcome to Acme")
+    assert message_ids(db, query) == ['m1']
+
+
+def test_operators_are_plain_terms(db):
+    add_email(db, 'm1', body="Welcome to Acme")
+    add_email(db, 'm2', body="Welcome to Globex")
+    add_email(db, 'm3', body="Our kubernetes platform")
+
+    # "OR" is a term every result must contain, not an operator
+    assert message_ids(db, "acme OR globex") == []
+    # A trailing * is not a prefix query
+    assert message_ids(db, "kube*") == []
+
+
+def test_subject_matches_rank_above_body_matches(db):
+    add_email(db, 'body', subject="Update", body="We use python every day")
+    add_email(db, 'subject', subject="Python developer", body="Thanks for applying")
+
+    assert message_ids(db, "python") == ['subject', 'body']
+
+
+def test_every_term_must_match(search_db):
+    add_email(search_db, 'm1', body="Senior kubernetes recruiter")
+    add_email(search_db, 'm2', body="Kubernetes platform team")
+
+    assert message_ids(search_db, "kubernetes recruiter") == ['m1']
+    assert search_db.search_emails("   ") == ([], 0)
+
+
+def test_total_and_offset_page_through_all_matches(search_db):
+    for i in range(25):
+        add_email(search_db, f'm{i:02}', body=f"Recruiter note {i}", received_date=date(2026, 10, 1 + i))
+    add_email(search_db, 'other', body="Unrelated")
+
+    pages = [search_db.search_emails("recruiter", limit=10, offset=offset) for offset in (0, 10, 20, 30)]
+
+    assert [total for _, total in pages] == [25, 25, 25, 25]
+    assert [len(results) for results, _ in pages] == [10, 10, 5, 0]
+    found = [result['message_id'] for results, _ in pages for result in results]
+    assert sorted(found) == [f'm{i:02}' for i in range(25)]
+
+
+def test_results_have_the_same_shape_on_both_backends(search_db):
+    application = Application(company="Acme", job_title="Data Engineer", application_date=date(2026, 10, 5),
+                              status="Interview Scheduled")
+    search_db.session.add(application)
+    search_db.session.commit()
+    add_email(search_db, 'm1', subject="Interview", body="Kubernetes chat", application=application)
+    add_email(search_db, 'm2', subject="Newsletter", body="Kubernetes news", received_date=None)
+
+    results, total = search_db.search_emails("kubernetes")
+
+    assert total == 2
+    by_id = {result['message_id']: result for result in results}
+    assert by_id['m1']['received_date'] == date(2026, 10, 5)
+    assert by_id['m2']['received_date'] is None
+    assert (by_id['m1']['company'], by_id['m1']['job_title'], by_id['m1']['status']) == (
+        "Acme", "Data Engineer", "Interview Scheduled"
+    )
+    assert by_id['m2']['company'] is None
+    assert 'kubernetes' in by_id['m1']['snippet'].lower()
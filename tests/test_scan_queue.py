@@ -0,0 +1,259 @@
+import base64
+from datetime import datetime, timedelta
+import pytest
+import config
+from database import (
+    DatabaseManager, Application, EmailMessage, ScanQueueItem, DeadLetter,
+    QUEUE_PENDING, QUEUE_FETCHED, QUEUE_PARSED, QUEUE_STORED, QUEUE_FAILED,
+)
+from email_processor import EmailProcessor
+
+
+def encode_body(text, charset='utf-8'):
+    return base64.urlsafe_b64encode(text.encode(charset)).decode('ascii')
+
+
+class StubRequest:
+    def __init__(self, run):
+        self.run = run
+
+    def execute(self, num_retries=0):
+        return self.run()
+
+
+class StubGmail:
+    """Stands in for the Gmail API client used by EmailProcessor.
+
+    `emails` maps message ids to (sender, subject, base64 body). Errors put
+    in `list_errors` or `get_errors[message_id]` are raised by the next call.
+    """
+
+    def __init__(self, emails):
+        self.emails = emails
+        self.list_errors = []
+        self.get_errors = {}
+        self.fetched = []
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId, q):
+        def run():
+            if self.list_errors:
+                raise self.list_errors.pop(0)
+            return {'messages': [{'id': message_id} for message_id in self.emails]}
+        return StubRequest(run)
+
+    def get(self, userId, id):
+        def run():
+            self.fetched.append(id)
+            if self.get_errors.get(id):
+                raise self.get_errors[id].pop(0)
+            sender, subject, body = self.emails[id]
+            return {'payload': {
+                'headers': [
+                    {'name': 'From', 'value': sender},
+                    {'name': 'Subject', 'value': subject},
+                    {'name': 'Date', 'value': 'Mon, 05 Oct 2026 10:00:00 +0000'},
+                ],
+                'body': {'data': body},
+            }}
+        return StubRequest(run)
+
+
+@pytest.fixture
+def gmail():
+    return StubGmail({
+        'm1': ('Acme Careers <jobs@acme.com>', 'Application received',
+               encode_body('Thank you for applying. We will review your application.')),
+        'm2': ('Globex <talent@globex.com>', 'Your application',
+               encode_body('We regret to inform you that the position has been filled.')),
+    })
+
+
+@pytest.fixture
+def processor(database_url, gmail, monkeypatch):
+    monkeypatch.setattr(EmailProcessor, 'setup_gmail_service', lambda self: None)
+    processor = EmailProcessor()
+    processor.service = gmail
+    yield processor
+    processor.db.session.close()
+    processor.db.engine.dispose()
+
+
+def queue_items(db):
+    return {item.message_id: item for item in db.session.query(ScanQueueItem)}
+
+
+def make_due(db):
+    """Pretend every backoff has expired"""
+    for item in db.session.query(ScanQueueItem):
+        item.next_attempt_at = None
+    db.session.commit()
+
+
+def test_enqueue_skips_queued_and_indexed_messages(db):
+    assert db.enqueue_messages(['a', 'b', 'b']) == 2
+    assert db.enqueue_messages(['a', 'b', 'c']) == 1
+
+    db.session.add(EmailMessage(message_id='d', subject='indexed'))
+    db.session.commit()
+    assert db.enqueue_messages(['d']) == 0
+    assert sorted(queue_items(db)) == ['a', 'b', 'c']
+
+
+def test_scan_moves_messages_through_every_stage(processor):
+    processor.scan_emails()
+
+    items = queue_items(processor.db)
+    assert {item.state for item in items.values()} == {QUEUE_STORED}
+    assert all(item.payload is None and item.parsed is None for item in items.values())
+
+    statuses = {app.company: app.status for app in processor.db.session.query(Application)}
+    assert statuses == {'Acme': 'Application Received', 'Globex': 'Rejected'}
+    assert processor.db.session.query(EmailMessage).count() == 2
+
+
+def test_rescan_does_not_refetch_stored_messages(processor, gmail):
+    processor.scan_emails()
+    processor.scan_emails()
+
+    assert sorted(gmail.fetched) == ['m1', 'm2']
+    assert processor.db.session.query(Application).count() == 2
+
+
+def test_failures_back_off_then_dead_letter(db):
+    db.enqueue_messages(['a'])
+    item = queue_items(db)['a']
+
+    for attempt in range(1, config.SCAN_MAX_ATTEMPTS):
+        db.record_queue_failure(item, RuntimeError('timeout'))
+        assert item.state == QUEUE_PENDING
+        assert item.attempts == attempt
+        delay = config.SCAN_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+        assert item.next_attempt_at - item.updated_at == timedelta(seconds=delay)
+        assert db.get_unfinished_messages() == []
+
+    db.record_queue_failure(item, RuntimeError('timeout'))
+    assert item.state == QUEUE_FAILED
+    dead_letters = db.get_dead_letters()
+    assert [(d.message_id, d.stage, d.attempts, d.error) for d in dead_letters] == [
+        ('a', QUEUE_PENDING, config.SCAN_MAX_ATTEMPTS, 'timeout')
+    ]
+
+
+def test_failure_without_retry_dead_letters_at_once(db):
+    db.enqueue_messages(['a'])
+    item = queue_items(db)['a']
+
+    db.record_queue_failure(item, ValueError('bad payload'), retry=False)
+
+    assert item.state == QUEUE_FAILED
+    assert [d.attempts for d in db.get_dead_letters()] == [1]
+
+
+def test_requeue_dead_letters_resumes_from_failed_stage(db):
+    db.enqueue_messages(['a'])
+    item = queue_items(db)['a']
+    db.update_queue_item(item, QUEUE_FETCHED, payload='{}')
+    db.record_queue_failure(item, ValueError('bad payload'), retry=False)
+
+    assert db.requeue_dead_letters() == 1
+
+    assert db.get_dead_letters() == []
+    assert (item.state, item.attempts, item.payload) == (QUEUE_FETCHED, 0, '{}')
+    assert db.get_unfinished_messages() == [item]
+
+
+def test_list_failure_still_processes_queued_messages(processor, gmail):
+    processor.db.enqueue_messages(['m1'])
+    gmail.list_errors.append(RuntimeError('list failed'))
+
+    with pytest.raises(RuntimeError, match='list failed'):
+        processor.scan_emails()
+
+    items = queue_items(processor.db)
+    assert list(items) == ['m1']
+    assert items['m1'].state == QUEUE_STORED
+
+
+def test_scan_resumes_after_fetch_failure(processor, gmail):
+    gmail.get_errors['m2'] = [RuntimeError('503')]
+
+    processor.scan_emails()
+
+    items = queue_items(processor.db)
+    assert items['m1'].state == QUEUE_STORED
+    assert (items['m2'].state, items['m2'].attempts, items['m2'].last_error) == (QUEUE_PENDING, 1, '503')
+    assert items['m2'].next_attempt_at > datetime.now()
+
+    # Still backing off: nothing is fetched again
+    processor.scan_emails()
+    assert gmail.fetched == ['m1', 'm2']
+
+    make_due(processor.db)
+    processor.scan_emails()
+    assert gmail.fetched == ['m1', 'm2', 'm2']
+    assert queue_items(processor.db)['m2'].state == QUEUE_STORED
+
+
+def test_scan_resumes_after_store_failure_without_refetching(processor, gmail, monkeypatch):
+    save_processed_email = DatabaseManager.save_processed_email
+    failures = [RuntimeError('database is locked')]
+
+    def flaky_save(self, item, *args, **kwargs):
+        if failures:
+            raise failures.pop()
+        return save_processed_email(self, item, *args, **kwargs)
+
+    monkeypatch.setattr(DatabaseManager, 'save_processed_email', flaky_save)
+
+    processor.scan_emails()
+    item = queue_items(processor.db)['m1']
+    assert (item.state, item.attempts) == (QUEUE_PARSED, 1)
+    assert item.parsed is not None
+
+    make_due(processor.db)
+    processor.scan_emails()
+
+    assert gmail.fetched == ['m1', 'm2']
+    assert {item.state for item in queue_items(processor.db).values()} == {QUEUE_STORED}
+
+
+def test_unparsable_message_is_dead_lettered_on_first_scan(processor, gmail):
+    gmail.emails['m3'] = ('Initech <hr@initech.com>', 'Your application', '!!!not-base64')
+
+    processor.scan_emails()
+
+    assert queue_items(processor.db)['m3'].state == QUEUE_FAILED
+    assert [(d.message_id, d.stage, d.attempts) for d in processor.db.get_dead_letters()] == [
+        ('m3', QUEUE_FETCHED, 1)
+    ]
+
+
+def test_non_utf8_body_is_still_stored(processor, gmail):
+    gmail.emails['m3'] = ('Initech <hr@initech.com>', 'Application received',
+                          encode_body('Merci, nous avons reçu votre candidature', 'latin-1'))
+
+    processor.scan_emails()
+
+    assert queue_items(processor.db)['m3'].state == QUEUE_STORED
+    assert 'Initech' in {app.company for app in processor.db.session.query(Application)}
+
+
+def test_failure_while_recording_a_failure_does_not_stop_the_scan(processor, gmail, monkeypatch):
+    gmail.get_errors['m1'] = [RuntimeError('503')]
+
+    def broken_record(item, error, retry=True):
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(processor.db, 'record_queue_failure', broken_record)
+
+    processor.scan_emails()
+
+    items = queue_items(processor.db)
+    assert items['m1'].state == QUEUE_PENDING
+    assert items['m2'].state == QUEUE_STORED
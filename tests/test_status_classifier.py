@@ -0,0 +1,82 @@
+import pytest
+from status_classifier import StatusClassifier
+
+
+@pytest.fixture(scope="module")
+def classifier():
+    return StatusClassifier()
+
+
+def classify_one(classifier, text, subject=""):
+    return classifier.classify([text], [subject])[0]
+
+
+def test_rejection_mentioning_next_steps(classifier):
+    result = classify_one(
+        classifier,
+        "Unfortunately we have decided to proceed with other candidates. "
+        "There are no next steps for this role.",
+        "Your application",
+    )
+    assert result['status'] == "Rejected"
+
+
+def test_confirmation_mentioning_unfortunately(classifier):
+    result = classify_one(
+        classifier,
+        "Thank you for applying. Unfortunately we receive many applications, "
+        "so we will review your application within two weeks.",
+        "Application received",
+    )
+    assert result['status'] == "Application Received"
+    assert not result['needs_review']
+
+
+def test_negated_phrase_counts_against_its_status(classifier):
+    result = classify_one(classifier, "This is not a job offer. We will not schedule a call.")
+    assert result['status'] == "Under Review"
+
+
+@pytest.mark.parametrize("text", [
+    "this is a no-reply inbox. thank you for applying",
+    "ref no. 4821 - we received your application",
+    "the economy is not great. thank you for applying",
+    "no action is needed. we will review your application shortly",
+])
+def test_negation_stops_at_sentence_breaks_and_non_words(classifier, text):
+    assert classify_one(classifier, text)['status'] == "Application Received"
+
+
+def test_email_without_evidence_is_flagged(classifier):
+    result = classify_one(classifier, "Hello, just checking in.")
+    assert result == {'status': "Under Review", 'confidence': 0.0, 'needs_review': True}
+
+
+@pytest.mark.parametrize("text", [
+    "We'd love to set up an interview.",
+    "Thank you for your interest in Acme.",
+])
+def test_clear_single_signals_are_not_flagged(classifier, text):
+    assert not classify_one(classifier, text)['needs_review']
+
+
+def test_batch_matches_single_classification(classifier):
+    texts = [
+        "We regret to inform you that the position has been filled.",
+        "We would like to schedule a call to discuss next steps.",
+        "We are pleased to offer you the role. Your offer letter is attached.",
+        "Thanks for your time.",
+        None,
+    ]
+    subjects = ["Your application", "Interview invitation", "Offer", "", "Application received"]
+
+    batch = classifier.classify(texts, subjects)
+    assert batch == [classify_one(classifier, text, subject) for text, subject in zip(texts, subjects)]
+    assert [result['status'] for result in batch] == [
+        "Rejected", "Interview Scheduled", "Offer Received", "Under Review", "Application Received",
+    ]
+
+
+def test_empty_input(classifier):
+    assert classifier.classify([], []) == []
+    assert classify_one(classifier, "", "") == {'status': "Under Review", 'confidence': 0.0, 'needs_review': True}